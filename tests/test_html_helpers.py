@@ -0,0 +1,19 @@
+from wf_reg_test.html_helpers import Html, html_link, render, tag
+
+
+def test_text_is_escaped() -> None:
+    assert render("a < b & c") == "a &lt; b &amp; c"
+    assert tag("p", "<b>") == "<p>&lt;b&gt;</p>"
+    assert tag("a", href='x" onclick="y') == '<a href="x&quot; onclick=&quot;y"></a>'
+
+
+def test_html_is_not_escaped_twice() -> None:
+    assert render(Html("<b>hi</b>")) == "<b>hi</b>"
+    assert tag("p", tag("b", "a & b")) == "<p><b>a &amp; b</b></p>"
+    assert html_link("x", "?a=1&b=2") == '<a href="?a=1&amp;b=2">x</a>'
+
+
+def test_void_elements() -> None:
+    assert tag("br") == "<br/>"
+    assert tag("meta", charset="utf-8") == '<meta charset="utf-8"/>'
+    assert tag("span", "a", tag("br"), "b") == "<span>a<br/>b</span>"
@@ -1,4 +1,9 @@
+import concurrent.futures
+import dataclasses
+import itertools
 import logging
+import os
+import pickle
 import warnings
 from datetime import datetime as DateTime
 from datetime import timedelta as TimeDelta
@@ -11,51 +16,127 @@ from tqdm import tqdm
 
 from .engines import engines
 #from .registries import snakemake_registry
-from .report import report_html
+from .report import report_html_chunks
 from .repos import get_repo_accessor
-from .workflows2 import Revision2, WorkflowApp2
+from .workflows2 import Execution2, RepoAccessor, Revision2, WorkflowApp2
 
 logging.basicConfig()
 logger = logging.getLogger("wf_reg_test")
 logger.setLevel(logging.INFO)
 ch_time_block.disable_stderr()
 data = Path("data.yaml")
+# Unpickling is much faster than parsing YAML; data.yaml remains the source of truth.
+data_pickle = Path("data.pkl")
+
+# libyaml is only used for reading: CDumper wraps long strings differently from
+# the pure-Python Dumper, so writing with it would churn the tracked data.yaml.
+try:
+    from yaml import CLoader as YamlLoader
+except ImportError:
+    from yaml import Loader as YamlLoader  # type: ignore
+
+
+def load_wf_apps() -> list[WorkflowApp2]:
+    if (
+        data_pickle.exists()
+        and data_pickle.stat().st_mtime_ns >= data.stat().st_mtime_ns
+    ):
+        with data_pickle.open("rb") as file:
+            return cast(list[WorkflowApp2], pickle.load(file))
+    with data.open("rb") as file:
+        wf_apps = cast(list[WorkflowApp2], yaml.load(file, Loader=YamlLoader))
+    with data_pickle.open("wb") as file:
+        pickle.dump(wf_apps, file)
+    return wf_apps
+
+
+def store_wf_apps(wf_apps: list[WorkflowApp2]) -> None:
+    with data.open("w") as file:
+        yaml.dump(wf_apps, file, Dumper=yaml.Dumper)
+    # Written second, so its mtime marks it as up-to-date with data.yaml.
+    with data_pickle.open("wb") as file:
+        pickle.dump(wf_apps, file)
+
+
+def _observe_revisions(repo: RepoAccessor, wf_app: WorkflowApp2) -> list[Revision2]:
+    return list(repo.get_revisions(wf_app))
 
 
 @ch_time_block.decor()
 def ensure_revisions(
-    wf_apps: list[WorkflowApp2], only_empty: bool = True, delete_empty: bool = True
+    wf_apps: list[WorkflowApp2],
+    only_empty: bool = True,
+    delete_empty: bool = True,
+    max_workers: int = 8,
 ) -> list[WorkflowApp2]:
-    ret_wf_apps: list[WorkflowApp2] = []
-    for wf_app in tqdm(wf_apps):
-        if (not wf_app.revisions) or (not only_empty):
-            repo = get_repo_accessor(wf_app.repo_url)
-            db_revisions = list(wf_app.revisions)
-            observed_revisions = list(repo.get_revisions(wf_app))
-            deleted_revisions = [
-                drevision
-                for drevision in db_revisions
-                if not any(
-                    orevision.url == drevision.url for orevision in observed_revisions
-                )
-            ]
-            new_revisions = [
-                orevision
-                for orevision in observed_revisions
-                if not any(orevision.url == drevision.url for drevision in db_revisions)
-            ]
-            if deleted_revisions:
-                warnings.warn(
-                    f"{len(deleted_revisions)} deleted revisions on repo {repo}",
-                )
-            wf_app.revisions.extend(new_revisions)
-        if wf_app.revisions or (not delete_empty):
-            ret_wf_apps.append(wf_app)
-    return ret_wf_apps
+    stale_wf_apps = [
+        wf_app for wf_app in wf_apps if (not wf_app.revisions) or (not only_empty)
+    ]
+    # Several wf_apps can share a repo, so query each repo once, on behalf of the
+    # first wf_app that uses it.
+    repo_wf_apps: dict[RepoAccessor, WorkflowApp2] = {}
+    for wf_app in stale_wf_apps:
+        repo_wf_apps.setdefault(get_repo_accessor(wf_app.repo_url), wf_app)
+    # Querying the repos is latency-bound, so fan out; merge in this thread.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        repo_revisions = dict(
+            zip(
+                repo_wf_apps.keys(),
+                tqdm(
+                    executor.map(
+                        _observe_revisions, repo_wf_apps.keys(), repo_wf_apps.values()
+                    ),
+                    total=len(repo_wf_apps),
+                ),
+            )
+        )
+    for wf_app in stale_wf_apps:
+        repo = get_repo_accessor(wf_app.repo_url)
+        observed_revisions = [
+            dataclasses.replace(revision, workflow_app=wf_app, executions=[])
+            for revision in repo_revisions[repo]
+        ]
+        db_revisions = list(wf_app.revisions)
+        db_urls = {drevision.url for drevision in db_revisions}
+        observed_urls = {orevision.url for orevision in observed_revisions}
+        deleted_revisions = [
+            drevision
+            for drevision in db_revisions
+            if drevision.url not in observed_urls
+        ]
+        new_revisions = [
+            orevision
+            for orevision in observed_revisions
+            if orevision.url not in db_urls
+        ]
+        if deleted_revisions:
+            warnings.warn(
+                f"{len(deleted_revisions)} deleted revisions on repo {repo}",
+            )
+        wf_app.revisions.extend(new_revisions)
+    return [wf_app for wf_app in wf_apps if wf_app.revisions or (not delete_empty)]
 
 
 def report(wf_apps: list[WorkflowApp2]) -> None:
-    Path("docs/results.html").write_text(report_html(wf_apps))
+    results = Path("docs/results.html")
+    # Stream into a sibling file and swap it in, so a failed render leaves the
+    # previous report intact.
+    partial_results = results.with_name(f".{results.name}.partial")
+    try:
+        with partial_results.open("w") as file:
+            file.writelines(report_html_chunks(wf_apps))
+    except BaseException:
+        partial_results.unlink(missing_ok=True)
+        raise
+    os.replace(partial_results, results)
+
+
+def _run_revision(revision: Revision2) -> Execution2:
+    logger.info("Running %s", revision)
+    repo = get_repo_accessor(revision.workflow_app.repo_url)
+    with repo.checkout(revision.url) as local_copy:
+        wf_engine = engines[revision.workflow_app.workflow_engine_name]
+        return wf_engine.run(local_copy, revision)
 
 
 def ensure_recent_executions(
@@ -63,29 +144,53 @@ def ensure_recent_executions(
     period: TimeDelta,
     desired_count: int = 1,
     dry_run: bool = False,
+    max_workers: int = 1,
 ) -> None:
-    now = DateTime.now()
+    cutoff = DateTime.now() - period
     revisions_to_test: list[Revision2] = []
     for wf_app in wf_apps:
         for revision in wf_app.revisions:
             existing_count = sum(
-                execution.datetime > now - period
-                for execution in revision.executions
+                execution.datetime > cutoff for execution in revision.executions
             )
             if existing_count < desired_count:
                 revisions_to_test.extend([revision] * (desired_count - existing_count))
     # random.shuffle(revisions_to_test)
-    for revision in revisions_to_test:
-        logger.info("Running %s", revision)
-        if not dry_run:
-            repo = get_repo_accessor(revision.workflow_app.repo_url)
-            with repo.checkout(revision.url) as local_copy:
-                wf_engine = engines[revision.workflow_app.workflow_engine_name]
-                execution = wf_engine.run(local_copy, revision)
-                revision.executions.append(execution)
-        if not dry_run:
-            report(wf_apps)
-            data.write_text(yaml.dump(wf_apps))
+    if dry_run:
+        for revision in revisions_to_test:
+            logger.info("Running %s", revision)
+    else:
+        # Each run gets its own worktree and output dir, so runs can overlap, but
+        # they compete for the machine and skew the resource measurements.
+        # Hence the serial default.
+        revisions = iter(revisions_to_test)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Submit lazily, so a failed run leaves nothing queued behind it.
+            unrecorded = {
+                executor.submit(_run_revision, revision)
+                for revision in itertools.islice(revisions, max_workers)
+            }
+            try:
+                while unrecorded:
+                    done, _ = concurrent.futures.wait(
+                        unrecorded, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        unrecorded.remove(future)
+                        _record_execution(wf_apps, future.result())
+                        for revision in itertools.islice(revisions, 1):
+                            unrecorded.add(executor.submit(_run_revision, revision))
+            finally:
+                # Keep the runs that were already underway when another one failed.
+                for future in concurrent.futures.as_completed(unrecorded):
+                    if future.exception() is None:
+                        _record_execution(wf_apps, future.result())
+
+
+def _record_execution(wf_apps: list[WorkflowApp2], execution: Execution2) -> None:
+    execution.revision.executions.append(execution)
+    report(wf_apps)
+    store_wf_apps(wf_apps)
 
 
 def remove_phantom_executions(wf_apps: list[WorkflowApp2]) -> None:
@@ -99,15 +204,19 @@ def remove_phantom_executions(wf_apps: list[WorkflowApp2]) -> None:
 
 
 def check_nodes_are_owned(wf_apps: list[WorkflowApp2]) -> None:
+    # Everything in data/ is a direct child, so compare bare names.
     used_data = {
-        revision.tree for wf_app in wf_apps for revision in wf_app.revisions
-    } - {
-        execution.output
+        revision.tree.name
+        for wf_app in wf_apps
+        for revision in wf_app.revisions
+        if revision.tree is not None
+    } | {
+        execution.output.name
         for wf_app in wf_apps
         for revision in wf_app.revisions
         for execution in revision.executions
     }
-    orphaned_data = set(Path("data").iterdir()) - used_data
+    orphaned_data = set(os.listdir("data")) - used_data
     if orphaned_data:
         warnings.warn(f"Orphaned data found: {orphaned_data}")
 
@@ -115,9 +224,7 @@ def check_nodes_are_owned(wf_apps: list[WorkflowApp2]) -> None:
 @ch_time_block.decor()
 def main() -> None:
     with ch_time_block.ctx("load", print_start=False):
-        wf_apps = cast(
-            list[WorkflowApp2], yaml.load(data.read_text(), Loader=yaml.Loader)
-        )
+        wf_apps = load_wf_apps()
         assert all(isinstance(wf_app, WorkflowApp2) for wf_app in wf_apps)
     # with ch_time_block.ctx("process", print_start=False):
     # wf_apps.extend(snakemake_registry())
@@ -126,7 +233,7 @@ def main() -> None:
     # remove_phantom_executions(wf_apps)
     # check_nodes_are_owned(wf_apps)
     # with ch_time_block.ctx("store", print_start=False):
-    #     data.write_text(yaml.dump(wf_apps))
+    #     store_wf_apps(wf_apps)
     with ch_time_block.ctx("report", print_start=False):
         report(wf_apps)
 
@@ -1,60 +1,99 @@
+import functools
+import html
 import itertools
 from pathlib import Path
-from typing import Mapping, Optional, Sequence, TypeAlias
+from typing import Iterable, Mapping, Optional, Sequence, TypeAlias
 
-import domonic as html  # type: ignore
 
-TagLike: TypeAlias = html.Element | str
+# Already-rendered markup. Plain str is text, and gets escaped when rendered.
+class Html(str):
+    pass
+
+
+TagLike: TypeAlias = Html | str
+
+_void_elements = frozenset({"br", "link", "meta"})
+
+
+def render(elem: TagLike) -> Html:
+    return elem if isinstance(elem, Html) else Html(html.escape(elem, quote=False))
+
+
+def tag(name: str, *children: TagLike, **attributes: str) -> Html:
+    attributes_str = "".join(
+        f' {key}="{html.escape(value)}"' for key, value in attributes.items()
+    )
+    if name in _void_elements:
+        return Html(f"<{name}{attributes_str}/>")
+    else:
+        return Html(
+            f"<{name}{attributes_str}>"
+            + "".join([render(child) for child in children])
+            + f"</{name}>"
+        )
 
 
 def html_table(
-    elems: Sequence[Mapping[TagLike, Sequence[TagLike]]],
+    elems: Iterable[Mapping[str, TagLike]],
     headers: Optional[Sequence[TagLike]] = None,
-) -> html.Element:
-    if headers is None and elems:
-        headers = list(elems[0].keys())
+) -> Html:
+    return Html("".join(html_table_chunks(elems, headers)))
+
+
+def html_table_chunks(
+    elems: Iterable[Mapping[str, TagLike]],
+    headers: Optional[Sequence[TagLike]] = None,
+) -> Iterable[str]:
+    rows = iter(elems)
+    first_row = next(rows, None)
+    if headers is None and first_row is not None:
+        headers = list(first_row.keys())
+    yield "<table>"
     if headers is not None:
-        thead = [html.thead(html.tr(*[html.td(header) for header in headers]))]
-    else:
-        thead = []
-    return html.table(
-        *thead,
-        html.tbody(
-            *[html.tr(*[html.td(elem) for elem in row.values()]) for row in elems]
-        ),
-    )
+        yield "<thead><tr>"
+        yield from [f"<td>{render(header)}</td>" for header in headers]
+        yield "</tr></thead>"
+    yield "<tbody>"
+    if first_row is not None:
+        for row in itertools.chain([first_row], rows):
+            yield "<tr>"
+            yield from [f"<td>{render(elem)}</td>" for elem in row.values()]
+            yield "</tr>"
+    yield "</tbody></table>"
 
 
-def html_list(elements: Sequence[TagLike], ordered: bool = False) -> html.Element:
-    list_factory = html.ol() if ordered else html.ul()
-    return list_factory(*[html.li(element) for element in elements])
+def html_list(elements: Sequence[TagLike], ordered: bool = False) -> Html:
+    return tag("ol" if ordered else "ul", *[tag("li", element) for element in elements])
 
 
-def html_link(text: TagLike, target: str) -> html.Element:
-    return html.a(text, _href=target)
+def html_link(text: TagLike, target: str) -> Html:
+    return tag("a", text, href=target)
 
 
-def html_fs_link(path: Path) -> html.Element:
-    return html_link(text=html.code(str(path)), target=f"file://{path.resolve()}")
+def html_fs_link(path: Path) -> Html:
+    return html_link(text=tag("code", str(path)), target=f"file://{path.resolve()}")
 
 
-def highlighted_head(languages: Sequence[str]) -> Sequence[html.Element]:
+def highlighted_head(languages: Sequence[str]) -> Sequence[Html]:
     # for supported langs https://cdnjs.com/libraries/highlight.js
     return [
-        html.link(
-            _rel="stylesheet",
-            _href="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.3.1/styles/default.min.css",
-        )(),
-        html.script(
-            _src="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.3.1/highlight.min.js",
-        )(""),
+        tag(
+            "link",
+            rel="stylesheet",
+            href="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.3.1/styles/default.min.css",
+        ),
+        tag(
+            "script",
+            src="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.3.1/highlight.min.js",
+        ),
         *[
-            html.script(
-                _src=f"https://cdn.jsdelivr.net/gh/highlightjs/cdn-release@11.3.1/build/languages/{lang}.min.js",
-            )("")
+            tag(
+                "script",
+                src=f"https://cdn.jsdelivr.net/gh/highlightjs/cdn-release@11.3.1/build/languages/{lang}.min.js",
+            )
             for lang in languages
         ],
-        html.script("hljs.highlightAll();"),
+        tag("script", Html("hljs.highlightAll();")),
     ]
 
 
@@ -62,6 +101,8 @@ def css_rule(selector: str, declarations: Mapping[str, str]) -> str:
     return selector + " {" + css_attribute(**declarations) + "}"
 
 
+# Called with the same few declarations for every element that uses them.
+@functools.lru_cache(maxsize=1024)
 def css_attribute(**declarations: str) -> str:
     return ";".join(
         [
@@ -71,10 +112,13 @@ def css_attribute(**declarations: str) -> str:
     )
 
 
-def highlighted_code(lang: str, code: str, width: int = 60) -> html.Element:
+def highlighted_code(lang: str, code: str, width: int = 60) -> Html:
     # see https://highlightjs.org/usage/
-    return html.pre(
-        html.code(
+    return tag(
+        "pre",
+        tag(
+            "code",
+            code,
             **{
                 "class": f"language-{lang}",
                 "style": css_attribute(
@@ -82,33 +126,35 @@ def highlighted_code(lang: str, code: str, width: int = 60) -> html.Element:
                     max_height="20vw",
                     resize="both",
                 ),
-            }
-        )(code)
+            },
+        ),
     )
 
 
-def collapsed(
-    summary: TagLike, *details: TagLike, is_open: bool = False
-) -> html.Element:
-    return html.details(
-        html.summary(summary), *details, **({"_open": ""} if is_open else {})
+def collapsed(summary: TagLike, *details: TagLike, is_open: bool = False) -> Html:
+    return tag(
+        "details",
+        tag("summary", summary),
+        *details,
+        **({"open": ""} if is_open else {}),
     )
 
 
-def html_emoji_bool(val: bool) -> html.Element:
-    return html.span(
+def html_emoji_bool(val: bool) -> Html:
+    return tag(
+        "span",
         {
             False: "❌",
             True: "✅",
-        }[val]
+        }[val],
     )
 
 
-def br_join(lines: Sequence[TagLike]) -> html.Element:
-    return html.span(
-        *itertools.chain.from_iterable((line, html.br()) for line in lines)
+def br_join(lines: Sequence[TagLike]) -> Html:
+    return tag(
+        "span", *itertools.chain.from_iterable((line, tag("br")) for line in lines)
     )
 
 
-def small(text: str) -> html.Element:
-    return html.span(text, _style=css_attribute(font_size="8pt"))
+def small(text: str) -> Html:
+    return tag("span", text, style=css_attribute(font_size="8pt"))
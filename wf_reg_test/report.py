@@ -1,15 +1,16 @@
 import itertools
 from datetime import datetime, timedelta
-from typing import Callable, Mapping, cast
-
-import domonic as html  # type: ignore
+from typing import Callable, Iterable, Mapping
 
 from .html_helpers import (
+    Html,
     collapsed,
     css_rule,
     html_emoji_bool,
     html_link,
     html_table,
+    html_table_chunks,
+    tag,
 )
 from .util import sorted_and_dropped
 from .workflows2 import WorkflowApp2 as WorkflowApp
@@ -19,13 +20,15 @@ def is_interesting(wf_app: WorkflowApp) -> bool:
     return sum(bool(revision.executions) for revision in wf_app.revisions) > 3
 
 
-def get_stats(all_wf_apps: list[WorkflowApp]) -> html.Element:
+def get_stats(all_wf_apps: list[WorkflowApp]) -> Html:
     engine2wf_apps = {
         key: list(group)
         for key, group in itertools.groupby(
             all_wf_apps, lambda wf_app: wf_app.workflow_engine_name
         )
     }
+    # is_interesting walks every revision, so evaluate it once per wf_app.
+    interesting_ids = {id(wf_app) for wf_app in all_wf_apps if is_interesting(wf_app)}
     stats: Mapping[str, Callable[[list[WorkflowApp]], int]] = {
         "N workflows": lambda wf_apps: len(wf_apps),
         "N revisions": lambda wf_apps: sum(len(wf_app.revisions) for wf_app in wf_apps),
@@ -35,15 +38,15 @@ def get_stats(all_wf_apps: list[WorkflowApp]) -> html.Element:
             for revision in wf_app.revisions
         ),
         "N interesting workflows": lambda wf_apps: sum(
-            1 for wf_app in wf_apps if is_interesting(wf_app)
+            1 for wf_app in wf_apps if id(wf_app) in interesting_ids
         ),
         "N revisions of interesting workflows": lambda wf_apps: sum(
-            len(wf_app.revisions) for wf_app in wf_apps if is_interesting(wf_app)
+            len(wf_app.revisions) for wf_app in wf_apps if id(wf_app) in interesting_ids
         ),
         "N executions of interesting workflows": lambda wf_apps: sum(
             len(revision.executions)
             for wf_app in wf_apps
-            if is_interesting(wf_app)
+            if id(wf_app) in interesting_ids
             for revision in wf_app.revisions
         ),
     }
@@ -62,18 +65,24 @@ def get_stats(all_wf_apps: list[WorkflowApp]) -> html.Element:
     )
 
 
-def html_date(dt: datetime) -> html.Element:
+def html_date(dt: datetime) -> str:
     return dt.strftime("%Y-%m-%d")
 
 
-def html_timedelta(td: timedelta, unit: str, digits: int) -> html.Element:
+def html_timedelta(td: timedelta, unit: str, digits: int) -> str:
     day_diff = td.total_seconds() / timedelta(**{unit: 1}).total_seconds()
     return f"{day_diff:.{digits}f} {unit}"
 
 
 def report_html(wf_apps: list[WorkflowApp]) -> str:
-    table_by_workflows = html_table(
-        [
+    return "".join(report_html_chunks(wf_apps))
+
+
+# Yields the page piece by piece so it can be written out as it is rendered; only
+# the executions table, which is sorted, is built up front.
+def report_html_chunks(wf_apps: list[WorkflowApp]) -> Iterable[str]:
+    table_by_workflows = html_table_chunks(
+        (
             {
                 "Workflow": html_link(wf_app.display_name, wf_app.url),
                 "Engine": wf_app.workflow_engine_name,
@@ -119,9 +128,9 @@ def report_html(wf_apps: list[WorkflowApp]) -> str:
                 ),
             }
             for wf_app in wf_apps
-        ]
+        )
     )
-    table_by_executions = html_table(
+    table_by_executions = html_table_chunks(
         sorted_and_dropped(
             [
                 (
@@ -157,47 +166,49 @@ def report_html(wf_apps: list[WorkflowApp]) -> str:
             reverse=True,
         )
     )
-    return cast(
-        str,
-        html.html(
-            html.head(
-                html.meta(_charset="utf-8"),
-                html.meta(
-                    _http_equiv="Content-Type", _content="text/html; charset=utf-8"
-                ),
-                html.title("Workflow Registry Test results"),
-                html.style(
-                    "\n".join(
-                        [
-                            css_rule(
-                                "table, td",
-                                {
-                                    "padding": "10px",
-                                    "border": "1px solid black",
-                                    "border-collapse": "collapse",
-                                },
-                            ),
-                            css_rule(
-                                "thead",
-                                {
-                                    "font-weight": "bold",
-                                    "background-color": "lightgray",
-                                },
-                            ),
-                        ]
-                    )
-                ),
-            ),
-            html.body(
-                html.h1("Stats"),
-                get_stats(wf_apps),
-                html.h1("Workflows"),
-                table_by_workflows,
-                html.h1("Executions"),
-                table_by_executions,
+    yield "<!DOCTYPE html>"
+    yield "<html>"
+    yield tag(
+        "head",
+        tag("meta", charset="utf-8"),
+        tag(
+            "meta",
+            **{"http-equiv": "Content-Type", "content": "text/html; charset=utf-8"},
+        ),
+        tag("title", "Workflow Registry Test results"),
+        tag(
+            "style",
+            Html(
+                "\n".join(
+                    [
+                        css_rule(
+                            "table, td",
+                            {
+                                "padding": "10px",
+                                "border": "1px solid black",
+                                "border-collapse": "collapse",
+                            },
+                        ),
+                        css_rule(
+                            "thead",
+                            {
+                                "font-weight": "bold",
+                                "background-color": "lightgray",
+                            },
+                        ),
+                    ]
+                )
             ),
-        ).__format__(""),
+        ),
     )
+    yield "<body>"
+    yield tag("h1", "Stats")
+    yield get_stats(wf_apps)
+    yield tag("h1", "Workflows")
+    yield from table_by_workflows
+    yield tag("h1", "Executions")
+    yield from table_by_executions
+    yield "</body></html>"
 
 
 # TODO: put execution resource statistics
@@ -1,21 +1,31 @@
 from __future__ import annotations
 
 import dataclasses
+import functools
+import itertools
 import json
+import os
+import shutil
+import tempfile
+import threading
 import types
 import urllib.parse
+from datetime import datetime as DateTime
 from pathlib import Path
-from typing import ContextManager, Optional
+from typing import ContextManager, Optional, cast
 
 import git
 import github
 import xxhash
+from urllib3.util.retry import Retry
 
 from .workflows2 import RepoAccessor
 from .workflows2 import Revision2 as Revision
 from .workflows2 import WorkflowApp2 as WorkflowApp
 
 
+# Accessors are immutable, so one per URL can be shared by every caller.
+@functools.lru_cache(maxsize=256)
 def get_repo_accessor(url: str) -> RepoAccessor:
     parsed_url = urllib.parse.urlparse(url)
     path = Path(parsed_url.path)
@@ -36,10 +46,27 @@ def get_repo_accessor(url: str) -> RepoAccessor:
 cache_path = Path(".cache2")
 
 
-github_client = github.Github(json.loads(Path("secrets.json").read_text())["github"])
+_github_token = json.loads(Path("secrets.json").read_text())["github"]
 
+# PyGithub's Requester sends every call through one shared connection object, so
+# concurrent calls on one client can receive each other's responses. Hence one
+# client per thread, each reusing its connection across pages.
+_github_clients = threading.local()
 
-@dataclasses.dataclass
+
+def get_github_client() -> github.Github:
+    if not hasattr(_github_clients, "client"):
+        _github_clients.client = github.Github(
+            _github_token,
+            per_page=100,
+            retry=Retry(
+                total=5, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504)
+            ),
+        )
+    return cast(github.Github, _github_clients.client)
+
+
+@dataclasses.dataclass(frozen=True)
 class GitHubRepo(RepoAccessor):
     user: str
     repo: str
@@ -49,22 +76,66 @@ class GitHubRepo(RepoAccessor):
     def url(self) -> str:
         return f"https://github.com/{self.user}/{self.repo}"
 
+    @property
+    def _revisions_cache_path(self) -> Path:
+        kind = "tags" if self.only_tags else "commits"
+        return cache_path / "revisions" / f"{self.user}_{self.repo}_{kind}.json"
+
     def get_revisions(self, wf_app: WorkflowApp) -> list[Revision]:
-        repo = github_client.get_user(self.user).get_repo(self.repo)
+        repo = get_github_client().get_repo(f"{self.user}/{self.repo}")
+        if repo.pushed_at is None:
+            # Nothing has ever been pushed, so there are no tags or commits.
+            return []
+        # pushed_at moves whenever any ref (tags included) is pushed, so if it is
+        # unchanged, the listing saved last time is still current.
+        pushed_at = repo.pushed_at.isoformat()
+        if self._revisions_cache_path.exists():
+            cached = json.loads(self._revisions_cache_path.read_text())
+            if cached["pushed_at"] == pushed_at:
+                revs = [
+                    (rev, DateTime.fromisoformat(datetime))
+                    for rev, datetime in cached["revisions"]
+                ]
+                return self._make_revisions(wf_app, revs)
         if self.only_tags:
-            revs = ((tag.commit, tag.name) for tag in repo.get_tags())
+            revs = [
+                (tag.name, tag.commit.commit.committer.date) for tag in repo.get_tags()
+            ]
         else:
-            revs = ((commit, commit.sha) for commit in repo.get_commits())
+            revs = [
+                (commit.sha, commit.commit.committer.date)
+                for commit in repo.get_commits()
+            ]
+        self._revisions_cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so a concurrent reader never sees a partial file.
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self._revisions_cache_path.parent, delete=False
+        ) as file:
+            json.dump(
+                {
+                    "pushed_at": pushed_at,
+                    "revisions": [
+                        (rev, datetime.isoformat()) for rev, datetime in revs
+                    ],
+                },
+                file,
+            )
+        os.replace(file.name, self._revisions_cache_path)
+        return self._make_revisions(wf_app, revs)
+
+    def _make_revisions(
+        self, wf_app: WorkflowApp, revs: list[tuple[str, DateTime]]
+    ) -> list[Revision]:
         return [
             Revision(
                 workflow_app=wf_app,
                 executions=[],
                 display_name=rev,
                 url=f"{self.url}/tree/{rev}",
-                datetime=commit.commit.committer.date,
+                datetime=datetime,
                 tree=None,
             )
-            for commit, rev in revs
+            for rev, datetime in revs
         ]
 
     def checkout(self, url: str) -> ContextManager[Path]:
@@ -78,21 +149,73 @@ class GitHubRepo(RepoAccessor):
         return GitHubRevision(repo=self, revision=path_parts[4])
 
 
+# Guards the two tables below; never held while git runs.
+_git_lock = threading.Lock()
+# Serializes clones and worktree bookkeeping within one clone, so checkouts of
+# different repos don't wait on each other.
+_repo_locks: dict[Path, threading.Lock] = {}
+# Worktrees currently handed out by a GitHubRevision.
+_worktrees_in_use: set[Path] = set()
+
+
 @dataclasses.dataclass
 class GitHubRevision:
     repo: GitHubRepo
     revision: str
+    _worktree: Optional[Path] = dataclasses.field(default=None, init=False, repr=False)
+
+    @property
+    def _url_hash(self) -> str:
+        return xxhash.xxh32(self.repo.url.encode("utf-8")).hexdigest()
+
+    @property
+    def _repo_path(self) -> Path:
+        return cache_path / self._url_hash
 
     def __enter__(self) -> Path:
-        url_hash = xxhash.xxh32(self.repo.url.encode("utf-8")).hexdigest()
-        repo_path = cache_path / url_hash
-        if not repo_path.exists():
-            repo = git.repo.Repo.clone_from(self.repo.url, repo_path)
-        else:
-            repo = git.repo.Repo(repo_path)
-        with repo:
-            repo.head.reset(self.revision, index=True, working_tree=True)
-            return repo_path
+        # Each concurrent checkout of a repo gets its own worktree. Worktrees live at
+        # stable paths and are reused, so switching revisions only rewrites files
+        # that differ, and path-keyed caches (hash_path, .gitignore) keep hitting.
+        worktrees_path = (cache_path / "worktrees").resolve()
+        worktrees_path.mkdir(parents=True, exist_ok=True)
+        with _git_lock:
+            repo_lock = _repo_locks.setdefault(self._repo_path, threading.Lock())
+            worktree = next(
+                worktree
+                for worktree in (
+                    worktrees_path / f"{self._url_hash}-{index}"
+                    for index in itertools.count()
+                )
+                if worktree not in _worktrees_in_use
+            )
+            _worktrees_in_use.add(worktree)
+        is_new = not (worktree / ".git").exists()
+        try:
+            if is_new:
+                with repo_lock:
+                    if not self._repo_path.exists():
+                        repo = git.repo.Repo.clone_from(self.repo.url, self._repo_path)
+                    else:
+                        repo = git.repo.Repo(self._repo_path)
+                    with repo:
+                        repo.git.worktree("prune")
+                        repo.git.worktree(
+                            "add", "--detach", str(worktree), self.revision
+                        )
+            else:
+                # The worktree is ours alone, and checkout only writes its own index
+                # and HEAD, so this needs no lock.
+                with git.repo.Repo(worktree) as worktree_repo:
+                    worktree_repo.git.checkout("--force", "--detach", self.revision)
+                    worktree_repo.git.clean("-ffdx")
+        except BaseException:
+            if is_new:
+                shutil.rmtree(worktree, ignore_errors=True)
+            with _git_lock:
+                _worktrees_in_use.discard(worktree)
+            raise
+        self._worktree = worktree
+        return worktree
 
     def __exit__(
         self,
@@ -100,4 +223,7 @@ class GitHubRevision:
         _exc_value: Optional[BaseException],
         _traceback: Optional[types.TracebackType],
     ) -> None:
-        pass
+        if self._worktree is not None:
+            with _git_lock:
+                _worktrees_in_use.discard(self._worktree)
+            self._worktree = None
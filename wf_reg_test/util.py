@@ -1,10 +1,14 @@
+import concurrent.futures
 import contextlib
+import functools
+import mmap
+import os
 import tempfile
 from pathlib import Path
-from typing import Callable, Generator, Iterable, TypeVar, Union, cast
+from typing import Any, Callable, Generator, Iterable, TypeVar, Union
 
+import pathspec  # type: ignore
 import xxhash
-from gitignore_parser import parse_gitignore  # type: ignore
 
 
 @contextlib.contextmanager
@@ -13,20 +17,34 @@ def create_temp_dir() -> Generator[Path, None, None]:
         yield Path(tmpdir)
 
 
+# Small files are cheaper to read in one go than to map.
+_mmap_threshold = 1 << 16
+
+# (absolute path, hash size) -> (st_size, st_mtime_ns, digest).
+# Files that have not changed since they were last hashed are not reread.
+_hash_path_cache: dict[tuple[str, int], tuple[int, int, int]] = {}
+
+
 def hash_path(path: Union[Path, str, bytes], size: int = 128) -> int:
+    key = (os.fsdecode(os.path.abspath(path)), size)
+    stat = os.stat(path)
+    cached = _hash_path_cache.get(key)
+    if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
     hasher = {
         128: xxhash.xxh128(),
         64: xxhash.xxh64(),
         32: xxhash.xxh32(),
     }[size]
-    block_size = 1 << 14
     with open(path, "rb") as file:
-        while True:
-            buffer = file.read(block_size)
-            if not buffer:
-                break
-            hasher.update(buffer)
-    return hasher.intdigest()
+        if stat.st_size < _mmap_threshold:
+            hasher.update(file.read())
+        else:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                hasher.update(buffer)
+    digest = hasher.intdigest()
+    _hash_path_cache[key] = (stat.st_size, stat.st_mtime_ns, digest)
+    return digest
 
 
 def hash_bytes(buffer: bytes, size: int = 128) -> int:
@@ -39,34 +57,87 @@ def hash_bytes(buffer: bytes, size: int = 128) -> int:
     return hasher.intdigest()
 
 
+# Ignore predicates see directories with a trailing slash, as gitignore does.
 def _ignore_vcs(path: str) -> bool:
-    return path == ".git" or path.endswith("/.git")
+    return path in {".git", ".git/"} or path.endswith(("/.git", "/.git/"))
+
+
+def _parse_gitignore(path: Path) -> Callable[[str], bool]:
+    return _cached_parse_gitignore(os.path.abspath(path), path.stat().st_mtime_ns)
+
+
+# Keyed on mtime so an edited .gitignore gets reparsed.
+@functools.lru_cache(maxsize=4096)
+def _cached_parse_gitignore(path: str, _mtime_ns: int) -> Callable[[str], bool]:
+    base_dir = os.path.dirname(path)
+    with open(path) as file:
+        spec = pathspec.PathSpec.from_lines("gitwildmatch", file)
+
+    def matches(subpath: str) -> bool:
+        relpath = os.path.relpath(subpath, base_dir)
+        return bool(
+            spec.match_file(relpath + "/" if subpath.endswith("/") else relpath)
+        )
+
+    return matches
 
 
 _T = TypeVar("_T")
 _V = TypeVar("_V")
 
 
+# Leaves are mapped on this pool; xxhash releases the GIL while hashing.
+_walk_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=(os.cpu_count() or 1) * 2
+)
+
+
 def walk(
     mapper: Callable[[Path, list[_T]], _T],
     path: Path,
     ignore_preds: tuple[Callable[[str], bool], ...] = (_ignore_vcs,),
 ) -> _T:
-    if path.is_dir():
-        ignore_file = path / ".gitignore"
-        if ignore_file.exists():
-            ignore_preds = (
-                *ignore_preds,
-                cast(Callable[[str], bool], parse_gitignore(ignore_file)),
-            )
-        children = [
-            walk(mapper, subpath, ignore_preds)
-            for subpath in path.iterdir()
-            if not any(ignore_pred(str(subpath)) for ignore_pred in ignore_preds)
-        ]
+    # Schedule every leaf before waiting on any of them, so sibling subtrees are
+    # mapped concurrently. Directories are mapped here once their children are
+    # done, which keeps pool workers from ever blocking on the pool.
+    return _gather(mapper, _schedule(mapper, path, path.is_dir(), ignore_preds))
+
+
+_Pending = Union[concurrent.futures.Future[_T], tuple[Path, list[Any]]]
+
+
+def _schedule(
+    mapper: Callable[[Path, list[_T]], _T],
+    path: Path,
+    is_dir: bool,
+    ignore_preds: tuple[Callable[[str], bool], ...],
+) -> _Pending[_T]:
+    if is_dir:
+        # DirEntry carries the file type from the directory listing, so this
+        # avoids a stat per entry.
+        with os.scandir(path) as entries_iter:
+            entries = list(entries_iter)
+        if any(entry.name == ".gitignore" for entry in entries):
+            ignore_preds = (*ignore_preds, _parse_gitignore(path / ".gitignore"))
+        children: list[_Pending[_T]] = []
+        for entry in entries:
+            entry_is_dir = entry.is_dir()
+            entry_str = f"{entry.path}/" if entry_is_dir else entry.path
+            if not any(ignore_pred(entry_str) for ignore_pred in ignore_preds):
+                children.append(
+                    _schedule(mapper, path / entry.name, entry_is_dir, ignore_preds)
+                )
+        return (path, children)
+    else:
+        return _walk_executor.submit(mapper, path, [])
+
+
+def _gather(mapper: Callable[[Path, list[_T]], _T], pending: _Pending[_T]) -> _T:
+    if isinstance(pending, concurrent.futures.Future):
+        return pending.result()
     else:
-        children = []
-    return mapper(path, children)
+        path, children = pending
+        return mapper(path, [_gather(mapper, child) for child in children])
 
 
 def sorted_and_dropped(inp: Iterable[tuple[_T, _V]], reverse: bool = False) -> list[_V]: